@@ -1,21 +1,18 @@
 #!/usr/bin/env python3
 """
 Apply to ALL eligible sale lotteries
-Uses the same pagination approach as get_lottery_ids.py
+Grid pages are read one page ahead while applying to the current one
 """
 
-from housing_connect_bot import HousingConnectBot
-import time
-import random
+import argparse
+import sys
+from housing_connect_bot import (
+    HousingConnectBot, is_final_outcome, load_applied_cache, partition_results, prefetch_lottery_pages,
+    record_applied_result
+)
 
 
-def random_delay(min_sec=2, max_sec=5):
-    """Random delay to appear more human-like and avoid rate limits"""
-    delay = random.uniform(min_sec, max_sec)
-    time.sleep(delay)
-
-
-def main():
+def main(refresh_days=None):
     print("=" * 60)
     print("APPLYING TO ALL SALE LOTTERIES")
     print("=" * 60)
@@ -32,124 +29,100 @@ def main():
             print("ERROR: Login failed!")
             return
         
-        # Navigate to sales
-        print("\nStep 2: Navigating to sale lotteries...")
-        bot.navigate_to_lotteries("sale")
-        
-        # Get total pages
-        total_pages = bot._get_total_pages()
-        print(f"\nTotal pages: {total_pages}")
-        
         all_results = []
-        processed_titles = set()
+        processed_ids = set()
+        # Outcomes from previous runs, so applied/ineligible lotteries aren't revisited
+        applied_cache = load_applied_cache(max_age_days=refresh_days)
         
-        for page_num in range(1, total_pages + 1):
+        # A second Chromium process (its own window) walks the grid one page ahead,
+        # sharing our login cookies, so this bot only ever visits detail pages
+        print("\nStep 2: Reading sale lotteries...")
+        pages = prefetch_lottery_pages(
+            "sale", headless=False, storage_state=bot.context.storage_state(), skip_applied=True
+        )
+        
+        for page_num, total_pages, lotteries in pages:
             print(f"\n{'='*60}")
             print(f"PAGE {page_num} OF {total_pages}")
             print(f"{'='*60}")
             
-            # Navigate to the correct page using the bot's _go_to_page method
-            if page_num > 1:
-                print(f"Navigating to page {page_num}...")
-                bot._go_to_page(page_num)
-                random_delay(2, 4)
-            
-            # Get cards on this page
-            cards = bot.page.query_selector_all('app-lottery-grid-card')
-            num_cards = len(cards)
+            num_cards = len(lotteries)
             print(f"Found {num_cards} lotteries on this page")
             
-            # Collect card data FIRST before any navigation
-            card_data = []
-            for i, card in enumerate(cards):
-                title_el = card.query_selector('.title.title-h3')
-                title = title_el.text_content().strip() if title_el else f"Unknown_{i}"
-                
-                # Check if already applied on card
-                applied_btn = card.query_selector('button.btn-grey-90')
-                is_applied = applied_btn and 'Applied' in (applied_btn.text_content() or '')
-                
-                card_data.append({
-                    'index': i,
-                    'title': title,
-                    'is_applied': is_applied
-                })
-            
             # Process each card
-            for data in card_data:
-                card_index = data['index']
-                title = data['title']
+            for card_index, lottery in enumerate(lotteries):
+                title = lottery.title
                 
                 print(f"\n--- Lottery {card_index+1}/{num_cards}: {title} ---")
                 
-                if title in processed_titles:
+                if lottery.id in processed_ids:
                     print(f"  Skipping duplicate")
                     continue
                 
-                processed_titles.add(title)
+                processed_ids.add(lottery.id)
+                
+                cached = applied_cache.get(lottery.id)
+                if cached and is_final_outcome(cached, bot.annual_income):
+                    print(f"  Skipping ({cached['status']} in a previous run)")
+                    continue
                 
-                if data['is_applied']:
+                if lottery.is_applied:
                     print(f"  ⚠ Already applied (skipping)")
-                    all_results.append({
+                    result = {
                         'success': False,
                         'already_applied': True,
                         'eligible': True,
                         'title': title,
                         'message': 'Already applied'
-                    })
-                    continue
+                    }
+                else:
+                    # Open the detail page directly instead of re-paginating the grid
+                    result = bot.apply_to_lottery_by_id(lottery.id, title)
                 
-                # Navigate back to lotteries and to the correct page
-                bot.navigate_to_lotteries("sale")
-                random_delay(2, 3)
-                
-                if page_num > 1:
-                    bot._go_to_page(page_num)
-                    random_delay(2, 3)
-                
-                # Apply using the card index
-                result = bot.apply_to_lottery_by_click(card_index, "sale")
                 all_results.append(result)
-                
-                random_delay(2, 4)
+                record_applied_result(applied_cache, lottery.id, title, result, bot.annual_income)
+        
+        # Final Summary, written in one go
+        buckets = partition_results(all_results)
+        applied = buckets["applied"]
+        already = buckets["already_applied"]
+        not_eligible = buckets["not_eligible"]
+        locked = buckets["locked"]
+        failed = buckets["failed"]
         
-        # Final Summary
-        print("\n" + "=" * 60)
-        print("FINAL SUMMARY")
-        print("=" * 60)
+        out = ["\n" + "=" * 60, "FINAL SUMMARY", "=" * 60]
         
-        applied = [r for r in all_results if r['success']]
-        already = [r for r in all_results if r['already_applied']]
-        not_eligible = [r for r in all_results if not r['eligible']]
-        failed = [r for r in all_results if not r['success'] and not r['already_applied'] and r['eligible']]
+        out.append(f"\n✓ Successfully Applied ({len(applied)}):")
+        out += [f"    - {r['title']}" for r in applied]
         
-        print(f"\n✓ Successfully Applied ({len(applied)}):")
-        for r in applied:
-            print(f"    - {r['title']}")
+        out.append(f"\n⚠ Already Applied ({len(already)}):")
+        out += [f"    - {r['title']}" for r in already]
         
-        print(f"\n⚠ Already Applied ({len(already)}):")
-        for r in already:
-            print(f"    - {r['title']}")
+        out.append(f"\n✗ Not Eligible ({len(not_eligible)}):")
+        out += [f"    - {r['title']}: {r['message']}" for r in not_eligible]
         
-        print(f"\n✗ Not Eligible ({len(not_eligible)}):")
-        for r in not_eligible:
-            print(f"    - {r['title']}: {r['message']}")
+        if locked:
+            out.append(f"\n🔒 Locked, recent unconfirmed submission ({len(locked)}):")
+            out += [f"    - {r['title']}" for r in locked]
         
         if failed:
-            print(f"\n? Failed ({len(failed)}):")
-            for r in failed:
-                print(f"    - {r['title']}: {r['message']}")
+            out.append(f"\n? Failed ({len(failed)}):")
+            out += [f"    - {r['title']}: {r['message']}" for r in failed]
         
-        print(f"\n" + "-" * 40)
-        print(f"TOTAL: {len(all_results)} processed")
-        print(f"  - Applied: {len(applied)}")
-        print(f"  - Already Applied: {len(already)}")
-        print(f"  - Not Eligible: {len(not_eligible)}")
-        print(f"  - Failed: {len(failed)}")
+        out.append("\n" + "-" * 40)
+        out.append(f"TOTAL: {len(all_results)} processed")
+        out.append(f"  - Applied: {len(applied)}")
+        out.append(f"  - Already Applied: {len(already)}")
+        out.append(f"  - Not Eligible: {len(not_eligible)}")
+        out.append(f"  - Locked: {len(locked)}")
+        out.append(f"  - Failed: {len(failed)}")
         
-        print("\n  Keeping browser open for 5 seconds...")
-        time.sleep(5)
+        sys.stdout.write("\n".join(out) + "\n")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Apply to all eligible sale lotteries")
+    parser.add_argument("--refresh", type=float, metavar="DAYS",
+                        help="re-check lotteries whose cached outcome is older than DAYS (0 = all)")
+    args = parser.parse_args()
+    main(refresh_days=args.refresh)
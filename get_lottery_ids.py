@@ -6,8 +6,45 @@ NO LOGIN REQUIRED - public data
 Saves to rental_ids.txt, sale_ids.txt, and all_lotteries.json
 """
 
-import json
-from housing_connect_bot import HousingConnectBot
+import argparse
+import sys
+import orjson
+from housing_connect_bot import HousingConnectBot, get_all_lottery_ids
+
+
+# Fields written to all_lotteries.json for each lottery
+JSON_FIELDS = ("id", "title", "location", "units_available", "days_until_closing", "is_applied", "url")
+
+
+def print_lotteries(lotteries):
+    """Print one line per lottery with a single stdout write"""
+    lines = [
+        f"  [{l.id}] {l.title} " + (f"({l.days_until_closing} days left)" if l.days_until_closing else "")
+        for l in lotteries
+    ]
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+
+def write_lotteries_json(f, lotteries):
+    """Write lotteries as comma-separated JSON objects, one per line, without building the full list"""
+    for i, lottery in enumerate(lotteries):
+        record = {field: getattr(lottery, field) for field in JSON_FIELDS}
+        f.write((b"    " if i == 0 else b",\n    ") + orjson.dumps(record))
+
+
+def capture_api():
+    """Print the XHR/fetch requests the site makes while browsing the lottery grid"""
+    with HousingConnectBot(headless=False) as bot:
+        requests = bot.capture_api_requests()
+        bot.navigate_to_lotteries("rental")
+        if bot._get_total_pages() > 1:
+            bot._go_to_page(2)
+        bot.navigate_to_lotteries("sale")
+    
+    print("\nAPI requests made by the lottery grid:")
+    for request in dict.fromkeys(requests):
+        print(f"  {request}")
 
 
 def main():
@@ -17,13 +54,9 @@ def main():
     print("=" * 60)
     print()
     
-    # headless=False to see the browser for debugging
-    with HousingConnectBot(headless=False) as bot:
-        print("Step 1: Getting rental lottery IDs...")
-        rental_lotteries = bot.get_lottery_ids("rental")
-        
-        print("\nStep 2: Getting sale lottery IDs...")
-        sale_lotteries = bot.get_lottery_ids("sale")
+    # headless=False to see the browsers for debugging
+    print("Getting rental and sale lottery IDs in parallel...")
+    rental_lotteries, sale_lotteries = get_all_lottery_ids(headless=False)
     
     # Results
     print("\n" + "=" * 60)
@@ -31,55 +64,26 @@ def main():
     print("=" * 60)
     
     print(f"\nRental Lotteries: {len(rental_lotteries)} found")
-    for lottery in rental_lotteries:
-        days = f"({lottery.days_until_closing} days left)" if lottery.days_until_closing else ""
-        print(f"  [{lottery.id}] {lottery.title} {days}")
+    print_lotteries(rental_lotteries)
     
-    rental_ids = [l.id for l in rental_lotteries]
     with open("rental_ids.txt", "w") as f:
-        f.write("\n".join(rental_ids))
-    print(f"\n  → Saved {len(rental_ids)} IDs to rental_ids.txt")
+        f.writelines(f"{l.id}\n" for l in rental_lotteries)
+    print(f"\n  → Saved {len(rental_lotteries)} IDs to rental_ids.txt")
     
     print(f"\nSale Lotteries: {len(sale_lotteries)} found")
-    for lottery in sale_lotteries:
-        days = f"({lottery.days_until_closing} days left)" if lottery.days_until_closing else ""
-        print(f"  [{lottery.id}] {lottery.title} {days}")
+    print_lotteries(sale_lotteries)
     
-    sale_ids = [l.id for l in sale_lotteries]
     with open("sale_ids.txt", "w") as f:
-        f.write("\n".join(sale_ids))
-    print(f"\n  → Saved {len(sale_ids)} IDs to sale_ids.txt")
-    
-    # Save detailed JSON
-    all_lotteries = {
-        "rentals": [
-            {
-                "id": l.id,
-                "title": l.title,
-                "location": l.location,
-                "units_available": l.units_available,
-                "days_until_closing": l.days_until_closing,
-                "is_applied": l.is_applied,
-                "url": l.url
-            }
-            for l in rental_lotteries
-        ],
-        "sales": [
-            {
-                "id": l.id,
-                "title": l.title,
-                "location": l.location,
-                "units_available": l.units_available,
-                "days_until_closing": l.days_until_closing,
-                "is_applied": l.is_applied,
-                "url": l.url
-            }
-            for l in sale_lotteries
-        ]
-    }
+        f.writelines(f"{l.id}\n" for l in sale_lotteries)
+    print(f"\n  → Saved {len(sale_lotteries)} IDs to sale_ids.txt")
     
-    with open("all_lotteries.json", "w") as f:
-        json.dump(all_lotteries, f, indent=2)
+    # Save detailed JSON, streamed one lottery at a time
+    with open("all_lotteries.json", "wb") as f:
+        f.write(b'{\n  "rentals": [\n')
+        write_lotteries_json(f, rental_lotteries)
+        f.write(b'\n  ],\n  "sales": [\n')
+        write_lotteries_json(f, sale_lotteries)
+        f.write(b'\n  ]\n}\n')
     print(f"\n  → Full details saved to all_lotteries.json")
     
     print("\n" + "=" * 60)
@@ -88,4 +92,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Get all NYC Housing Connect lottery IDs")
+    parser.add_argument("--capture-api", action="store_true",
+                        help="only print the API requests the lottery grid makes")
+    args = parser.parse_args()
+    
+    if args.capture_api:
+        capture_api()
+    else:
+        main()
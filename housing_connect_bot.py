@@ -8,19 +8,246 @@ Automates the process of:
 
 import os
 import re
+import sys
+import atexit
 import json
 import time
-import random
-from typing import Optional
+import queue
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import defaultdict
+from urllib.parse import urlparse
+from typing import Iterator, Optional
 from dataclasses import dataclass
-from playwright.sync_api import sync_playwright, Page, Browser, TimeoutError as PlaywrightTimeout
+from playwright.sync_api import (
+    sync_playwright, Page, Browser, BrowserContext, ElementHandle, TimeoutError as PlaywrightTimeout
+)
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Progress messages; set LOG_LEVEL=DEBUG for per-card lines or WARNING to keep only problems
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
-@dataclass
+APPLIED_CACHE_FILE = "applied_cache.json"
+LOCK_DIR = "locks"
+LOCK_TTL = 600  # Seconds a leftover submission lock blocks re-submitting
+STORAGE_STATE_FILE = "storage_state.json"
+STORAGE_STATE_TTL = 12 * 3600  # Seconds a saved login session is reused before logging in again
+LOTTERY_CACHE_FILE = "lottery_cache.db"
+LOTTERY_CACHE_TTL = 24 * 3600  # Seconds a cached detail-page income range is trusted
+# Outcomes that won't change on a re-run, so cached lotteries with these are skipped
+# (not_eligible only while the income it was judged against is unchanged)
+FINAL_STATUSES = {"applied", "already_applied", "not_eligible"}
+
+# Card / pagination / detail page text patterns
+_PHOTO_RE = re.compile(r'/photos/(\d+)\.')
+_UNIT_RE = re.compile(r'(\d+)\s*Unit')
+_DAYS_RE = re.compile(r'(\d+)\s*days?', re.IGNORECASE)
+_INCOME_RE = re.compile(r'Eligible Income:?\s*\$?([\d,]+)\s*-\s*\$?([\d,]+)', re.IGNORECASE)
+_PAGINATION_RE = re.compile(r'(\d+)\s*/\s*(\d+)')
+
+# Raw text of one lottery card, read in a single round-trip
+_CARD_EXTRACT_JS = """card => {
+    const text = selector => card.querySelector(selector)?.textContent ?? null;
+    const img = card.querySelector('img.card-image');
+    return {
+        imgSrc: img ? img.getAttribute('src') : null,
+        title: text('.title.title-h3'),
+        location: text('.location'),
+        unitsText: text('.pb-xs.title-h6'),
+        closingText: text('.prefix.title-h4'),
+        appliedText: text('button.btn-grey-90'),
+    };
+}"""
+
+# Same for every card on the grid (used with page.eval_on_selector_all)
+_CARDS_EXTRACT_JS = f"cards => cards.map({_CARD_EXTRACT_JS})"
+
+# Whether any grid card lacks the "Applied" badge
+_HAS_UNAPPLIED_JS = """() => Array.from(document.querySelectorAll('app-lottery-grid-card')).some(card =>
+    !/Applied/.test(card.querySelector('button.btn-grey-90')?.textContent ?? ''))"""
+
+# Whether a grid tab label is the selected one
+_TAB_ACTIVE_JS = """tab => !!tab.closest('.active, [aria-selected="true"], .mat-tab-label-active')"""
+
+# Only the bits of the detail page text we need, instead of shipping the whole body over CDP
+_DETAIL_EXTRACT_JS = """() => {
+    const text = document.body.textContent ?? '';
+    const income = text.match(/Eligible Income:?\\s*\\$?[\\d,]+\\s*-\\s*\\$?[\\d,]+/i);
+    return {
+        incomeText: income ? income[0] : '',
+        applied: text.includes('You have already applied') || text.includes('Application Submitted')
+    };
+}"""
+
+
+# Downloads the bot never needs: card/detail photos, web fonts, video and analytics beacons.
+# Stylesheets are kept since hover/visibility of the card buttons depends on them.
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_URL_PARTS = ("google-analytics", "googletagmanager", "doubleclick", "hotjar",
+                     "newrelic", "nr-data.net", "adobedtm", "omtrdc.net", "demdex.net")
+
+
+def _block_unneeded_resources(route, block_stylesheets: bool = False):
+    """Route handler that aborts requests for BLOCKED_RESOURCE_TYPES and analytics"""
+    request = route.request
+    if (request.resource_type in BLOCKED_RESOURCE_TYPES
+            or (block_stylesheets and request.resource_type == "stylesheet")
+            or any(part in request.url for part in BLOCKED_URL_PARTS)):
+        route.abort()
+    else:
+        route.continue_()
+
+
+class DomainLimiter:
+    """
+    Enforces a minimum gap between page loads on the same host, across all bots
+    Only sleeps for whatever part of the gap hasn't already passed
+    
+    The gap grows by an adaptive backoff while the site answers 429/503
+    (penalize) and shrinks again as page loads succeed (relax), so there's
+    no extra waiting while the site is healthy.
+    """
+    
+    def __init__(self, min_interval: float = 1.5, max_backoff: float = 30.0):
+        self.min_interval = min_interval
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+        self.last = defaultdict(float)
+        self.lock = threading.Lock()
+    
+    def acquire(self, host: str):
+        # Reserve the next free slot under the lock, then sleep outside it
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.last[host] + self.min_interval + self.backoff)
+            self.last[host] = slot
+        time.sleep(slot - now)
+    
+    def pause(self):
+        """Sleep for the current backoff before a non-navigation action (0 when healthy)"""
+        time.sleep(self.backoff)
+    
+    def penalize(self):
+        """The site is throttling us: double the backoff (plus 1s), up to max_backoff"""
+        with self.lock:
+            self.backoff = min(self.max_backoff, self.backoff * 2 + 1)
+    
+    def relax(self):
+        """A request went through: halve the backoff, dropping it once it's negligible"""
+        with self.lock:
+            self.backoff = self.backoff / 2 if self.backoff > 0.1 else 0.0
+
+
+_domain_limiter = DomainLimiter()
+
+
+# Per-thread Playwright state (sync API objects can't be used across threads)
+_thread_state = threading.local()
+
+
+def _shared_browser(headless: bool) -> Browser:
+    """
+    Chromium instance shared by every bot started in the current thread
+    Launched on first use so back-to-back bots only pay the startup cost once
+    """
+    if not hasattr(_thread_state, 'playwright'):
+        _thread_state.playwright = sync_playwright().start()
+        _thread_state.browsers = {}
+    
+    browser = _thread_state.browsers.get(headless)
+    if browser is None or not browser.is_connected():
+        # Simple browser launch - no fancy args
+        browser = _thread_state.playwright.chromium.launch(headless=headless)
+        _thread_state.browsers[headless] = browser
+    return browser
+
+
+def shutdown_browser():
+    """Close the current thread's shared browsers and stop Playwright"""
+    if not hasattr(_thread_state, 'playwright'):
+        return
+    for browser in _thread_state.browsers.values():
+        browser.close()
+    _thread_state.playwright.stop()
+    del _thread_state.playwright, _thread_state.browsers
+
+
+atexit.register(shutdown_browser)
+
+
+def _create_lock_file(path: str) -> bool:
+    """Atomically create an empty lock file; False if it already exists"""
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def _clear_stale_lock(path: str):
+    """
+    Remove a lock file older than LOCK_TTL (left by a crashed run)
+    
+    The lock is renamed to a name unique to this thread first, so when two runs
+    find the same stale lock only one of them takes it. If what got renamed is
+    a fresh lock another run created in the meantime, it's put back.
+    """
+    aside = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    try:
+        if time.time() - os.path.getmtime(path) < LOCK_TTL:
+            return
+        os.rename(path, aside)
+    except FileNotFoundError:
+        # Released or reclaimed by another run meanwhile
+        return
+    
+    if time.time() - os.path.getmtime(aside) < LOCK_TTL:
+        try:
+            os.link(aside, path)
+        except FileExistsError:
+            pass
+    os.remove(aside)
+
+
+@contextmanager
+def _submission_lock(lottery_id: str):
+    """
+    Hold locks/{lottery_id}.lock while submitting an application
+    
+    Yields False if a lock younger than LOCK_TTL already exists (a previous
+    submission may have gone through). The lock is removed only when the body
+    finishes normally, so a crash mid-submit leaves it in place.
+    """
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    path = os.path.join(LOCK_DIR, f"{lottery_id}.lock")
+    
+    if not _create_lock_file(path):
+        _clear_stale_lock(path)
+        # Still there after clearing a stale lock means another run holds it
+        if not _create_lock_file(path):
+            yield False
+            return
+    
+    yield True
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@dataclass(slots=True)
 class LotteryInfo:
     """Information about a lottery listing"""
     id: str
@@ -35,23 +262,87 @@ class LotteryInfo:
     url: Optional[str] = None
 
 
+class LotteryCache:
+    """
+    SQLite cache of detail-page income ranges keyed by lottery ID
+    
+    Lets later runs rule out ineligible lotteries without opening them.
+    One connection per bot, since bots live on different threads.
+    """
+    
+    def __init__(self, path: str = LOTTERY_CACHE_FILE, ttl: float = LOTTERY_CACHE_TTL):
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS lotteries ("
+            "id TEXT PRIMARY KEY, income_min INT, income_max INT, income_fetched_at REAL)"
+        )
+        self.conn.commit()
+    
+    def set_income(self, lottery_id: str, min_income: int, max_income: int):
+        """Record the income range read from a lottery's detail page"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO lotteries (id, income_min, income_max, income_fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET income_min = excluded.income_min, "
+                "income_max = excluded.income_max, income_fetched_at = excluded.income_fetched_at",
+                (lottery_id, min_income, max_income, time.time())
+            )
+    
+    def get_income(self, lottery_id: str) -> Optional[tuple[int, int]]:
+        """Cached (min_income, max_income) for a lottery, or None if missing or older than ttl"""
+        row = self.conn.execute(
+            "SELECT income_min, income_max FROM lotteries WHERE id = ? AND income_fetched_at > ?",
+            (lottery_id, time.time() - self.ttl)
+        ).fetchone()
+        if row is None or None in row:
+            return None
+        return row
+    
+    def close(self):
+        self.conn.close()
+
+
 class HousingConnectBot:
     """Bot to automate NYC Housing Connect lottery applications"""
     
     BASE_URL = "https://housingconnect.nyc.gov/PublicWeb"
     LOGIN_URL = f"{BASE_URL}/login"
     LOTTERIES_URL = f"{BASE_URL}/search-lotteries"
+    # Cards requested per grid page; if the site ignores it, pagination works as before
+    PAGE_SIZE = 200
+    # Header links that tell a logged-out page from a logged-in one
+    LOGIN_LINK_SELECTOR = 'a:has-text("Log In"), a:has-text("Login"), a:has-text("Sign In")'
+    LOGOUT_SELECTOR = ('a:has-text("Log Out"), a:has-text("Logout"), a:has-text("Sign Out"), '
+                       'button:has-text("Log Out"), button:has-text("Sign Out")')
+    # Seconds a tab's parsed page count is reused
+    PAGINATION_CACHE_TTL = 60
     
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, storage_state: Optional[dict] = None,
+                 block_stylesheets: bool = False):
         self.headless = headless
+        # Scrape-only bots don't need CSS; the apply flow keeps it for hover/click layout
+        self.block_stylesheets = block_stylesheets
+        # Cookies/local storage to start from, e.g. another bot's logged-in session
+        self.storage_state = storage_state
+        # Set once login() goes through the credential flow, so close() saves the session
+        self.logged_in = False
+        # Set once login() has confirmed this context is logged in (fresh login or saved session)
+        self.session_verified = False
         self.username = os.getenv("USERNAME")
         self.password = os.getenv("PASSWORD")
         # Support both SALARY and ANNUAL_INCOME env variables
         self.annual_income = int(os.getenv("SALARY") or os.getenv("ANNUAL_INCOME") or 50000)
         
-        self.playwright = None
         self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
+        self.cache: Optional[LotteryCache] = None
+        # Tab and page size of the last navigate_to_lotteries, and page counts per (tab, page size)
+        self._lottery_type: Optional[str] = None
+        self._page_size: Optional[int] = None
+        self._pagination_cache: dict[tuple[str, Optional[int]], tuple[int, float]] = {}
     
     def __enter__(self):
         self.start()
@@ -61,86 +352,160 @@ class HousingConnectBot:
         self.close()
     
     def start(self):
-        """Start the browser"""
-        self.playwright = sync_playwright().start()
+        """Open a fresh browser context on the shared browser"""
+        self.browser = _shared_browser(self.headless)
         
-        # Simple browser launch - no fancy args
-        self.browser = self.playwright.chromium.launch(
-            headless=self.headless,
-            slow_mo=100  # Slower to appear more human-like and avoid rate limits
-        )
+        # Reuse the session saved by an earlier run while it's still fresh
+        if self.storage_state is None and os.path.exists(STORAGE_STATE_FILE):
+            if time.time() - os.path.getmtime(STORAGE_STATE_FILE) < STORAGE_STATE_TTL:
+                self.storage_state = STORAGE_STATE_FILE
         
-        # Create a simple page
-        self.page = self.browser.new_page(
-            viewport={'width': 1280, 'height': 800}
+        # Each bot gets its own context (cookies, storage) and a single page
+        self.context = self.browser.new_context(
+            viewport={'width': 1280, 'height': 800},
+            storage_state=self.storage_state
         )
+        # Only the img src attribute is needed for IDs, not the image bytes
+        self.context.route("**/*", lambda route: _block_unneeded_resources(route, self.block_stylesheets))
+        self.page = self.context.new_page()
         self.page.set_default_timeout(60000)  # 60 second default timeout
-        print("Browser started successfully")
+        self.page.on("response", self._watch_for_throttling)
+        self.cache = LotteryCache()
+        logger.info("Browser started successfully")
     
     def close(self):
-        """Close the browser"""
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+        """Close this bot's context (the shared browser stays up for later bots)"""
+        if self.context:
+            if self.logged_in:
+                try:
+                    self.context.storage_state(path=STORAGE_STATE_FILE)
+                except Exception as e:
+                    logger.warning(f"Could not save login session: {e}")
+            self.context.close()
+            self.context = None
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+    
+    def _goto(self, url: str, throttle: bool = True):
+        """
+        page.goto, spaced out per host by the shared DomainLimiter
+        Pass throttle=False if the caller already called _domain_limiter.acquire
+        """
+        if throttle:
+            _domain_limiter.acquire(urlparse(url).hostname)
+        response = self.page.goto(url)
+        if response and response.ok:
+            _domain_limiter.relax()
+        return response
+    
+    @staticmethod
+    def _watch_for_throttling(response):
+        """Response listener: back off every bot when the site answers 429/503"""
+        # Only Housing Connect's own hosts (site and API); a third-party CDN hiccup isn't throttling
+        if response.status in (429, 503) and 'housingconnect' in (urlparse(response.url).hostname or ''):
+            _domain_limiter.penalize()
+            logger.warning(f"  Throttled ({response.status}) by {urlparse(response.url).hostname}, "
+                           f"backing off {_domain_limiter.backoff:.0f}s")
+    
+    def capture_api_requests(self) -> list[str]:
+        """
+        Record the XHR/fetch calls the SPA makes from now on
+        Used to find the JSON endpoint that backs the lottery grid
+        Returns a list that fills in as requests are made ("METHOD url")
+        """
+        captured = []
+        
+        def on_request(request):
+            if request.resource_type in ("xhr", "fetch"):
+                captured.append(f"{request.method} {request.url}")
+        
+        self.page.on("request", on_request)
+        return captured
     
-    def navigate_to_lotteries(self, lottery_type: str = "rental") -> bool:
+    def navigate_to_lotteries(self, lottery_type: str = "rental", page_size: Optional[int] = PAGE_SIZE) -> bool:
         """
         Navigate to the lotteries page (NO LOGIN REQUIRED)
         lottery_type: 'rental' or 'sale'
+        page_size: cards per page to request (None for the site default)
         """
-        print(f"Navigating to {lottery_type} lotteries...")
-        self.page.goto(self.LOTTERIES_URL)
-        
-        # Wait for page to load
-        time.sleep(3)
+        logger.info(f"Navigating to {lottery_type} lotteries...")
+        if lottery_type != self._lottery_type:
+            self._pagination_cache.clear()
+            self._lottery_type = lottery_type
+        self._page_size = page_size
+        url = f"{self.LOTTERIES_URL}?pageSize={page_size}" if page_size else self.LOTTERIES_URL
+        self._goto(url)
         
         # Wait for lottery cards to appear
         try:
             self.page.wait_for_selector('app-lottery-grid-card', timeout=15000)
-            print("Lottery cards loaded")
+            logger.info("Lottery cards loaded")
         except PlaywrightTimeout:
-            print("Timeout waiting for lottery cards, trying to continue...")
+            logger.warning("Timeout waiting for lottery cards, trying to continue...")
         
         # Click on the appropriate tab
         tab_text = "Rentals" if lottery_type == "rental" else "Sales"
         
         try:
-            # The tab is a span with class font-lg
-            tab = self.page.query_selector(f'span.font-lg:text-is("{tab_text}")')
+            # The tab is a span with class font-lg; fall back to any exact text match only if it's missing
+            tab = None
+            for selector in (f'span.font-lg:text-is("{tab_text}")', f':text-is("{tab_text}")'):
+                tab = self.page.query_selector(selector)
+                if tab:
+                    break
             if tab:
                 tab.click()
-                time.sleep(2)
-                print(f"Clicked on {tab_text} tab")
+                self._wait_for_network_idle()
+                logger.info(f"Clicked on {tab_text} tab")
                 return True
-            else:
-                # Try broader selector
-                tab = self.page.query_selector(f'text="{tab_text}"')
-                if tab:
-                    tab.click()
-                    time.sleep(2)
-                    print(f"Clicked on {tab_text} tab (alt)")
-                    return True
         except Exception as e:
-            print(f"Could not click tab: {e}")
+            logger.warning(f"Could not click tab: {e}")
         
         return True
     
-    def _get_total_pages(self) -> int:
-        """Get total number of pages from pagination"""
+    def _wait_for_network_idle(self, timeout: int = 5000):
+        """Wait for the page's requests to settle, without failing if they never do"""
+        try:
+            self.page.wait_for_load_state('networkidle', timeout=timeout)
+        except PlaywrightTimeout:
+            # Background polling can keep the network busy; the content is already there
+            pass
+    
+    def wait_for_grid(self, timeout: int = 10000):
+        """Wait until the lottery grid is rendered and its data requests have settled"""
+        self.page.wait_for_selector('app-lottery-grid-card', state='attached', timeout=timeout)
+        self._wait_for_network_idle()
+    
+    def _get_total_pages(self, lottery_type: Optional[str] = None) -> int:
+        """
+        Get total number of pages from pagination
+        lottery_type: tab to cache the count under (defaults to the tab last navigated to)
+        The count is cached per (tab, page size), since the page size changes it
+        """
+        tab = lottery_type or self._lottery_type
+        key = (tab, self._page_size) if tab else None
+        cached = self._pagination_cache.get(key)
+        if cached and time.monotonic() - cached[1] < self.PAGINATION_CACHE_TTL:
+            return cached[0]
+        
+        total_pages = 1
         try:
             # Look for pagination info like "1 / 4"
             pagination_text = self.page.query_selector('.small-screen')
             if pagination_text:
                 text = pagination_text.text_content()
-                print(f"Pagination text: {text}")
-                match = re.search(r'(\d+)\s*/\s*(\d+)', text)
+                logger.info(f"Pagination text: {text}")
+                match = _PAGINATION_RE.search(text)
                 if match:
-                    return int(match.group(2))
+                    total_pages = int(match.group(2))
         except Exception as e:
-            print(f"Error getting total pages: {e}")
+            logger.warning(f"Error getting total pages: {e}")
+            return total_pages
         
-        return 1
+        if key:
+            self._pagination_cache[key] = (total_pages, time.monotonic())
+        return total_pages
     
     def _go_to_page(self, page_num: int) -> bool:
         """Navigate to a specific page"""
@@ -162,150 +527,143 @@ class HousingConnectBot:
             if page_link:
                 page_link.click()
                 
-                # Wait for page content to actually change
-                for _ in range(10):  # Wait up to 5 seconds
-                    time.sleep(0.5)
-                    new_first_card = self.page.query_selector('app-lottery-grid-card img.card-image')
-                    new_src = new_first_card.get_attribute('src') if new_first_card else None
-                    if new_src != old_src:
-                        time.sleep(0.5)  # Small additional wait for full render
-                        return True
-                
-                print(f"  Warning: Page content may not have changed")
+                # Wait for page content to actually change (first card shows a different lottery)
+                try:
+                    self.page.wait_for_function(
+                        """oldSrc => {
+                            const img = document.querySelector('app-lottery-grid-card img.card-image');
+                            return img !== null && img.getAttribute('src') !== oldSrc;
+                        }""",
+                        arg=old_src,
+                        timeout=5000
+                    )
+                except PlaywrightTimeout:
+                    logger.warning(f"  Warning: Page content may not have changed")
                 return True
         except Exception as e:
-            print(f"Error navigating to page {page_num}: {e}")
+            logger.warning(f"Error navigating to page {page_num}: {e}")
         return False
     
-    def get_lottery_ids(self, lottery_type: str = "rental") -> list[LotteryInfo]:
+    def iter_lottery_pages(self, lottery_type: str = "rental",
+                           skip_applied: bool = False) -> Iterator[tuple[int, int, list[LotteryInfo]]]:
         """
-        Get all lottery IDs from all pages (NO LOGIN REQUIRED)
+        Walk every page of the lottery grid (NO LOGIN REQUIRED)
         lottery_type: 'rental' or 'sale'
-        Returns list of LotteryInfo objects
+        skip_applied: yield no lotteries for pages where every card is already applied
+        Yields (page_num, total_pages, lotteries on that page)
         """
         self.navigate_to_lotteries(lottery_type)
         
-        all_lotteries = []
-        seen_ids = set()
-        
         # Get total number of pages
-        total_pages = self._get_total_pages()
-        print(f"Found {total_pages} pages of {lottery_type} lotteries")
+        total_pages = self._get_total_pages(lottery_type)
+        logger.info(f"Found {total_pages} pages of {lottery_type} lotteries")
         
         for page_num in range(1, total_pages + 1):
             if page_num > 1:
-                print(f"Navigating to page {page_num}...")
+                logger.info(f"Navigating to page {page_num}...")
                 self._go_to_page(page_num)
+                self.wait_for_grid()
             
-            # Get lotteries from current page
-            page_lotteries = self._get_lotteries_from_current_page(lottery_type)
+            if skip_applied and not self.page.evaluate(_HAS_UNAPPLIED_JS):
+                logger.info(f"  Page {page_num}: every lottery already applied, skipping")
+                yield page_num, total_pages, []
+                continue
             
+            yield page_num, total_pages, self._get_lotteries_from_current_page(lottery_type)
+    
+    def get_lottery_ids(self, lottery_type: str = "rental") -> list[LotteryInfo]:
+        """
+        Get all lottery IDs from all pages (NO LOGIN REQUIRED)
+        lottery_type: 'rental' or 'sale'
+        Returns list of LotteryInfo objects
+        """
+        all_lotteries = []
+        seen_ids: set[str] = set()
+        zero_pages = 0  # Consecutive pages that added nothing new
+        
+        pages = self.iter_lottery_pages(lottery_type)
+        
+        for page_num, _, page_lotteries in pages:
             # Deduplicate - only add new lotteries
             new_count = 0
             for lottery in page_lotteries:
-                if lottery.id not in seen_ids:
-                    seen_ids.add(lottery.id)
-                    all_lotteries.append(lottery)
-                    new_count += 1
+                if lottery.id in seen_ids:
+                    continue
+                seen_ids.add(lottery.id)
+                all_lotteries.append(lottery)
+                new_count += 1
             
-            print(f"  Page {page_num}: Found {len(page_lotteries)} cards, {new_count} new lotteries")
+            logger.info(f"  Page {page_num}: Found {len(page_lotteries)} cards, {new_count} new lotteries")
+            
+            # Pagination has stalled if it keeps showing lotteries we already have
+            zero_pages = zero_pages + 1 if new_count == 0 else 0
+            if zero_pages >= 2:
+                logger.info(f"  No new lotteries on the last {zero_pages} pages, stopping early")
+                pages.close()
+                break
         
-        print(f"Total: Found {len(all_lotteries)} unique {lottery_type} lotteries")
+        logger.info(f"Total: Found {len(all_lotteries)} unique {lottery_type} lotteries")
         return all_lotteries
     
     def _get_lotteries_from_current_page(self, lottery_type: str) -> list[LotteryInfo]:
         """Get all lotteries from the current page"""
         lotteries = []
-        time.sleep(1)
-        
-        # Find all lottery cards
-        cards = self.page.query_selector_all('app-lottery-grid-card')
-        print(f"  Found {len(cards)} cards on page")
         
-        if not cards:
-            return []
+        # Read every card in a single page.evaluate (one CDP round-trip per page)
+        records = self.page.eval_on_selector_all('app-lottery-grid-card', _CARDS_EXTRACT_JS)
+        logger.info(f"  Found {len(records)} cards on page")
         
-        for i, card in enumerate(cards):
-            lottery_info = self._parse_lottery_card(card, lottery_type)
+        for record in records:
+            lottery_info = self._parse_lottery_record(record, lottery_type)
             if lottery_info:
                 lotteries.append(lottery_info)
-                print(f"    [{lottery_info.id}] {lottery_info.title}")
+                logger.debug("    [%s] %s", lottery_info.id, lottery_info.title)
         
         return lotteries
     
-    def _parse_lottery_card(self, card, lottery_type: str) -> Optional[LotteryInfo]:
-        """Parse a single lottery card element"""
-        try:
-            lottery_id = None
-            title = "Unknown"
-            location = None
-            units = None
-            days_closing = None
-            is_applied = False
-            
-            # Extract lottery ID from image src URL
-            # Example: src="https://a806-housingconnectapi.nyc.gov/MailTemplates/photos/34926806.png"
-            img = card.query_selector('img.card-image')
-            if img:
-                src = img.get_attribute('src')
-                if src:
-                    match = re.search(r'/photos/(\d+)\.', src)
-                    if match:
-                        lottery_id = match.group(1)
-            
-            # Get title from .title.title-h3
-            title_el = card.query_selector('.title.title-h3')
-            if title_el:
-                title = title_el.text_content().strip()
-            
-            # Get location from .location
-            location_el = card.query_selector('.location')
-            if location_el:
-                location = location_el.text_content().strip()
-            
-            # Get units available
-            units_el = card.query_selector('.pb-xs.title-h6')
-            if units_el:
-                units_text = units_el.text_content()
-                match = re.search(r'(\d+)\s*Unit', units_text)
-                if match:
-                    units = int(match.group(1))
-            
-            # Get days until closing
-            closing_el = card.query_selector('.prefix.title-h4')
-            if closing_el:
-                closing_text = closing_el.text_content()
-                match = re.search(r'(\d+)\s*days?', closing_text, re.IGNORECASE)
-                if match:
-                    days_closing = int(match.group(1))
-            
-            # Check if already applied
-            applied_btn = card.query_selector('button.btn-grey-90')
-            if applied_btn:
-                btn_text = applied_btn.text_content().strip()
-                if 'Applied' in btn_text:
-                    is_applied = True
-            
-            if lottery_id:
-                return LotteryInfo(
-                    id=lottery_id,
-                    title=title,
-                    lottery_type=lottery_type,
-                    location=location,
-                    units_available=units,
-                    days_until_closing=days_closing,
-                    is_applied=is_applied,
-                    url=f"{self.BASE_URL}/lottery-details/{lottery_id}"
-                )
-                
-        except Exception as e:
-            print(f"Error parsing card: {e}")
+    def _parse_lottery_record(self, record: dict, lottery_type: str) -> Optional[LotteryInfo]:
+        """Parse the raw text extracted from a single lottery card"""
+        lottery_id = None
+        units = None
+        days_closing = None
+        
+        # Extract lottery ID from image src URL
+        # Example: src="https://a806-housingconnectapi.nyc.gov/MailTemplates/photos/34926806.png"
+        if record['imgSrc']:
+            match = _PHOTO_RE.search(record['imgSrc'])
+            if match:
+                lottery_id = match.group(1)
+        
+        if not lottery_id:
+            logger.warning(f"  Skipping card without a lottery ID: {(record['title'] or '').strip() or '(untitled)'}")
+            return None
+        
+        # Get units available
+        if record['unitsText']:
+            match = _UNIT_RE.search(record['unitsText'])
+            if match:
+                units = int(match.group(1))
         
-        return None
+        # Get days until closing
+        if record['closingText']:
+            match = _DAYS_RE.search(record['closingText'])
+            if match:
+                days_closing = int(match.group(1))
+        
+        return LotteryInfo(
+            id=lottery_id,
+            title=(record['title'] or '').strip() or f"Lottery {lottery_id}",
+            lottery_type=lottery_type,
+            location=record['location'].strip() if record['location'] else None,
+            units_available=units,
+            days_until_closing=days_closing,
+            is_applied='Applied' in (record['appliedText'] or ''),
+            url=f"{self.BASE_URL}/lottery-details/{lottery_id}"
+        )
     
     def _parse_income_range(self, text: str) -> tuple[Optional[int], Optional[int]]:
         """Parse income range from text like 'Eligible Income: $32,195 - $226,800'"""
-        match = re.search(r'Eligible Income:?\s*\$?([\d,]+)\s*-\s*\$?([\d,]+)', text, re.IGNORECASE)
+        match = _INCOME_RE.search(text)
         if match:
             min_income = int(match.group(1).replace(',', ''))
             max_income = int(match.group(2).replace(',', ''))
@@ -314,6 +672,11 @@ class HousingConnectBot:
     
     # ========== LOGIN AND APPLY METHODS (Require credentials) ==========
     
+    @staticmethod
+    def _is_logged_in_url(url: str) -> bool:
+        """True once the auth flow has redirected back to the main site"""
+        return 'housingconnect.nyc.gov/PublicWeb' in url and 'id4/account/login' not in url
+    
     def login(self) -> bool:
         """
         Login to Housing Connect
@@ -323,51 +686,60 @@ class HousingConnectBot:
         2. Click login link (redirects to external auth)
         3. Fill credentials on auth page
         4. Submit and wait for redirect back
+        
+        Steps 2-4 are skipped when a saved session is still logged in.
         """
         if not self.username or not self.password:
-            print("ERROR: USERNAME and PASSWORD must be set in .env file")
+            logger.error("ERROR: USERNAME and PASSWORD must be set in .env file")
             return False
         
-        print(f"Step 1: Navigating to main page...")
-        self.page.goto(self.BASE_URL)
-        time.sleep(3)
+        logger.info(f"Step 1: Navigating to main page...")
+        self._goto(self.BASE_URL)
         
         try:
             # Step 2: Find and click login link
-            print("Step 2: Looking for login link...")
-            login_link = self.page.query_selector('a:has-text("Log In"), a:has-text("Login"), a:has-text("Sign In")')
+            logger.info("Step 2: Looking for login link...")
+            # Wait for the header to show either state, so a slow render isn't mistaken for either
+            try:
+                self.page.wait_for_selector(f"{self.LOGOUT_SELECTOR}, {self.LOGIN_LINK_SELECTOR}", timeout=15000)
+            except PlaywrightTimeout:
+                pass
+            
+            # A logout link means the saved session is still logged in
+            if self.page.query_selector(self.LOGOUT_SELECTOR):
+                logger.info("✓ Already logged in (saved session)")
+                self.session_verified = True
+                return True
             
+            login_link = self.page.query_selector(self.LOGIN_LINK_SELECTOR)
             if login_link:
                 login_link.click()
-                time.sleep(3)
-                print(f"  Redirected to: {self.page.url[:60]}...")
             else:
-                print("  Could not find login link")
+                logger.warning("  Could not find login link")
                 return False
             
             # Step 3: Wait for and fill login form
-            print("Step 3: Filling login form...")
+            logger.info("Step 3: Filling login form...")
             
             # Wait for the external auth page to load
             email_input = self.page.wait_for_selector(
                 'input[type="email"], input[type="text"], input[name="email"], input#email',
                 timeout=10000
             )
+            logger.info(f"  Redirected to: {self.page.url[:60]}...")
             
             password_input = self.page.query_selector('input[type="password"]')
             
             if not email_input or not password_input:
-                print("  Could not find login form fields")
+                logger.warning("  Could not find login form fields")
                 return False
             
             # Fill credentials
             email_input.fill(self.username)
-            time.sleep(0.5)
             password_input.fill(self.password)
-            time.sleep(0.5)
             
             # Step 4: Submit login
-            print("Step 4: Submitting login...")
+            logger.info("Step 4: Submitting login...")
             submit_btn = self.page.query_selector(
                 'button[type="submit"], input[type="submit"], button:has-text("Log In"), button:has-text("Login")'
             )
@@ -379,19 +751,24 @@ class HousingConnectBot:
                 password_input.press('Enter')
             
             # Wait for redirect back to main site
-            time.sleep(5)
+            try:
+                self.page.wait_for_url(self._is_logged_in_url, timeout=15000)
+            except PlaywrightTimeout:
+                pass
             
             # Check if login succeeded (should be back on main site with tokens)
             current_url = self.page.url
-            if 'housingconnect.nyc.gov/PublicWeb' in current_url and 'id4/account/login' not in current_url:
-                print("✓ Login successful!")
+            if self._is_logged_in_url(current_url):
+                logger.info("✓ Login successful!")
+                self.logged_in = True
+                self.session_verified = True
                 return True
             else:
-                print(f"✗ Login may have failed. Current URL: {current_url[:60]}...")
+                logger.warning(f"✗ Login may have failed. Current URL: {current_url[:60]}...")
                 return False
                 
         except Exception as e:
-            print(f"Login error: {e}")
+            logger.error(f"Login error: {e}")
             return False
     
     def apply_to_lottery_by_click(self, card_index: int, lottery_type: str = "rental") -> dict:
@@ -422,257 +799,512 @@ class HousingConnectBot:
             result['message'] = f"Card index {card_index} out of range"
             return result
         
-        card = cards[card_index]
+        return self.apply_to_lottery_by_handle(cards[card_index], lottery_type)
+    
+    def apply_to_lottery_by_handle(self, card: ElementHandle, lottery_type: str = "rental") -> dict:
+        """
+        Apply to a lottery from an already-resolved grid card (REQUIRES LOGIN)
+        
+        Args:
+            card: ElementHandle of an app-lottery-grid-card on the current page
+            lottery_type: 'rental' or 'sale'
+        
+        The handle is only valid until the page navigates, so use it for one
+        card per grid visit (apply_to_lottery_by_id avoids the grid entirely).
+        
+        Returns dict with result info
+        """
+        result = {
+            'success': False,
+            'message': '',
+            'already_applied': False,
+            'eligible': True,
+            'title': 'Unknown'
+        }
         
-        # Get title
-        title_el = card.query_selector('.title.title-h3')
-        result['title'] = title_el.text_content().strip() if title_el else "Unknown"
-        print(f"\nProcessing: {result['title']}")
+        # Read title and applied status in one round-trip
+        record = card.evaluate(_CARD_EXTRACT_JS)
+        result['title'] = (record['title'] or '').strip() or "Unknown"
+        match = _PHOTO_RE.search(record['imgSrc'] or '')
+        if match:
+            result['lottery_id'] = match.group(1)
+        logger.info(f"\nProcessing: {result['title']}")
         
         # Check if already applied (on the card)
-        applied_btn = card.query_selector('button.btn-grey-90')
-        if applied_btn and 'Applied' in (applied_btn.text_content() or ''):
+        if 'Applied' in (record['appliedText'] or ''):
             result['already_applied'] = True
             result['message'] = "Already applied"
-            print(f"  ⚠ Already applied (skipping)")
+            logger.info(f"  ⚠ Already applied (skipping)")
+            return result
+        
+        if self._cached_ineligible(result):
             return result
         
         # Hover and click View Details
+        card.scroll_into_view_if_needed()
         card.hover()
-        time.sleep(0.5)
         
         view_btn = card.query_selector('button:has-text("View Details")')
         if not view_btn:
             result['message'] = "Could not find View Details button"
-            print(f"  ✗ {result['message']}")
+            logger.info(f"  ✗ {result['message']}")
+            return result
+        
+        if not self._load_detail_page(view_btn.click):
+            result['message'] = "Detail page did not load"
+            logger.info(f"  ✗ {result['message']}")
+            return result
+        
+        if not self._apply_on_detail_page(result):
+            return result
+        
+        # Navigate back to lotteries list
+        logger.info(f"  Navigating back to list...")
+        if not self._back_to_grid():
+            self._goto(self.LOTTERIES_URL)
+            
+            try:
+                self.page.wait_for_selector('app-lottery-grid-card', timeout=45000)
+            except PlaywrightTimeout:
+                logger.warning(f"  Timeout on list, retrying...")
+                _domain_limiter.pause()
+                self.page.reload()
+                self.page.wait_for_selector('app-lottery-grid-card', timeout=60000)
+        
+        # History may bring back the default Rentals view, so check the tab either way
+        tab_text = "Sales" if lottery_type == "sale" else "Rentals"
+        tab = self.page.query_selector(f'span.font-lg:text-is("{tab_text}")')
+        if tab and not tab.evaluate(_TAB_ACTIVE_JS):
+            tab.click()
+            self._wait_for_network_idle()
+        
+        return result
+    
+    def _back_to_grid(self) -> bool:
+        """
+        Return to the search grid with history navigation
+        
+        The SPA usually restores the list (tab and page included) without
+        reloading it. Returns False if the grid didn't come back, so the
+        caller can fall back to loading LOTTERIES_URL. The caller still has to
+        check the active tab.
+        """
+        try:
+            self.page.go_back(wait_until='domcontentloaded')
+            self.page.wait_for_selector('app-lottery-grid-card', state='attached', timeout=5000)
+            return True
+        except PlaywrightTimeout:
+            return False
+    
+    def apply_to_lottery_by_id(self, lottery_id: str, title: Optional[str] = None) -> dict:
+        """
+        Apply to a lottery by opening its detail page directly (REQUIRES LOGIN)
+        
+        Unlike apply_to_lottery_by_click, this never touches the search grid,
+        so callers don't have to re-navigate and re-paginate between cards.
+        
+        Args:
+            lottery_id: Lottery ID (as parsed from the card image URL)
+            title: Title to report in the result (optional)
+        
+        Returns dict with result info
+        """
+        result = {
+            'success': False,
+            'message': '',
+            'already_applied': False,
+            'eligible': True,
+            'title': title or f"Lottery {lottery_id}",
+            'lottery_id': lottery_id
+        }
+        logger.info(f"\nProcessing: {result['title']}")
+        
+        if self._cached_ineligible(result):
             return result
         
-        view_btn.click()
+        url = f"{self.BASE_URL}/lottery-details/{lottery_id}"
+        # Wait our turn before the response timeout starts, so backoff doesn't eat into it
+        _domain_limiter.acquire(urlparse(url).hostname)
+        if not self._load_detail_page(lambda: self._goto(url, throttle=False)):
+            result['message'] = "Detail page did not load"
+            logger.info(f"  ✗ {result['message']}")
+            return result
+        self._apply_on_detail_page(result)
         
-        # Wait for detail page to fully load (longer timeout for rate-limited pages)
-        print(f"  Waiting for detail page to load...")
-        time.sleep(random.uniform(3, 5))  # Initial wait for SPA navigation
+        return result
+    
+    def _cached_ineligible(self, result: dict) -> bool:
+        """Mark result not eligible from the cached income range, skipping the detail page"""
+        cached = self.cache.get_income(result['lottery_id']) if result.get('lottery_id') else None
+        if cached is None:
+            return False
+        min_income, max_income = cached
+        if min_income <= self.annual_income <= max_income:
+            return False
+        result['eligible'] = False
+        result['message'] = f"Not eligible: ${self.annual_income:,} outside ${min_income:,} - ${max_income:,} (cached)"
+        logger.info(f"  ✗ {result['message']}")
+        return True
+    
+    @staticmethod
+    def _is_api_response(response) -> bool:
+        """True for a successful XHR/fetch from the Housing Connect API (what the SPA renders from)"""
+        return (response.request.resource_type in ("xhr", "fetch")
+                and 'housingconnectapi' in (urlparse(response.url).hostname or '')
+                and response.ok)
+    
+    def _load_detail_page(self, navigate) -> bool:
+        """
+        Run navigate() (a click or goto) and wait for the lottery detail page
+        
+        Waits on the API response that carries the detail data, then for the
+        page to render it. Returns False if either never happens.
+        """
+        logger.info(f"  Waiting for detail page to load...")
         
         try:
+            with self.page.expect_response(self._is_api_response, timeout=30000):
+                navigate()
             # Wait for any of these indicators: Apply Now button, Applied button, or income text
             self.page.wait_for_selector(
                 'a.btn-primary:has-text("Apply Now"), button.btn-grey-90:has-text("Applied"), '
                 'div:has-text("Eligible Income"), .col-md-6:has-text("Eligible Income")',
-                timeout=45000
+                timeout=15000
             )
         except PlaywrightTimeout:
-            print(f"  Warning: Timeout waiting for detail page content, retrying...")
-            self.page.reload()
-            time.sleep(random.uniform(5, 8))
-            try:
-                self.page.wait_for_selector(
-                    'a.btn-primary:has-text("Apply Now"), button.btn-grey-90:has-text("Applied")',
-                    timeout=45000
-                )
-            except PlaywrightTimeout:
-                print(f"  Still waiting, giving extra time...")
-                time.sleep(10)
-        
-        time.sleep(random.uniform(2, 4))  # Extra settle time for SPA rendering
-        
-        # Check if already applied (on detail page) - check multiple selectors
-        applied_indicator = self.page.query_selector('button.btn-grey-90:has-text("Applied")')
-        if not applied_indicator:
-            # Try other selectors for "Applied" status
-            applied_indicator = self.page.query_selector('button:has-text("Applied")')
-        if not applied_indicator:
-            # Check if page text contains "Applied" prominently
-            page_text_check = self.page.text_content('body') or ''
-            if 'You have already applied' in page_text_check or 'Application Submitted' in page_text_check:
-                applied_indicator = True
+            return False
+        
+        self._wait_for_network_idle()  # Let the SPA finish its detail requests
+        return True
+    
+    def _apply_on_detail_page(self, result: dict) -> bool:
+        """
+        Check eligibility and submit the application from a loaded detail page
+        
+        Updates result in place. Returns True if the application form was
+        submitted, False if it stopped early (already applied, not eligible,
+        or no Apply Now button).
+        """
+        # Applied message and income line from the page text, in one round-trip
+        details = self.page.evaluate(_DETAIL_EXTRACT_JS)
+        
+        # Check if already applied (on detail page) - one multi-selector query
+        applied_indicator = details['applied'] or self.page.query_selector(
+            'button.btn-grey-90:has-text("Applied"), button:has-text("Applied")'
+        )
         
         if applied_indicator:
             result['already_applied'] = True
             result['message'] = "Already applied"
-            print(f"  ⚠ Already applied (detail page)")
-            return result
+            logger.info(f"  ⚠ Already applied (detail page)")
+            return False
         
         # Now on detail page - check eligibility
-        page_text = self.page.text_content('body') or ''
-        min_income, max_income = self._parse_income_range(page_text)
+        min_income, max_income = self._parse_income_range(details['incomeText'])
         
         if min_income is not None and max_income is not None:
+            if result.get('lottery_id'):
+                self.cache.set_income(result['lottery_id'], min_income, max_income)
             if not (min_income <= self.annual_income <= max_income):
                 result['eligible'] = False
                 result['message'] = f"Not eligible: ${self.annual_income:,} outside ${min_income:,} - ${max_income:,}"
-                print(f"  ✗ {result['message']}")
-                return result
-            print(f"  ✓ Eligible: ${self.annual_income:,} within ${min_income:,} - ${max_income:,}")
+                logger.info(f"  ✗ {result['message']}")
+                return False
+            logger.info(f"  ✓ Eligible: ${self.annual_income:,} within ${min_income:,} - ${max_income:,}")
         
-        # Find Apply Now button
+        # Find Apply Now button, most specific selector first (usually one query)
         # Selector: <a class="btn btn-primary m-btn m-btn--icon m-btn--pill mt-sm">Apply Now</a>
-        apply_btn = self.page.query_selector('a.btn.btn-primary:has-text("Apply Now")')
-        if not apply_btn:
-            apply_btn = self.page.query_selector('a.btn-primary:has-text("Apply Now")')
-        if not apply_btn:
-            apply_btn = self.page.query_selector('a:has-text("Apply Now")')
+        apply_btn = None
+        for selector in ('a.btn.btn-primary:has-text("Apply Now")', 'a.btn-primary:has-text("Apply Now")',
+                         'a:has-text("Apply Now")'):
+            apply_btn = self.page.query_selector(selector)
+            if apply_btn:
+                break
         
         if not apply_btn:
             result['message'] = "Could not find Apply Now button"
-            print(f"  ✗ {result['message']}")
-            return result
+            logger.info(f"  ✗ {result['message']}")
+            return False
         
-        print(f"  Clicking Apply Now...")
+        # Lock from the first click on, so a crash mid-submit blocks a re-submit
+        # but failures before anything was clicked don't
+        lottery_id = result.get('lottery_id')
+        if not lottery_id:
+            return self._submit_application(apply_btn, result)
+        with _submission_lock(lottery_id) as acquired:
+            if not acquired:
+                result['locked'] = True
+                result['message'] = "Recent unconfirmed submission (lock held)"
+                logger.info(f"  ⚠ {result['message']}")
+                return False
+            return self._submit_application(apply_btn, result)
+    
+    def _submit_application(self, apply_btn: ElementHandle, result: dict) -> bool:
+        """Click Apply Now, confirm the agreement dialog and record whether it went through"""
+        logger.info(f"  Clicking Apply Now...")
+        _domain_limiter.pause()  # Only waits while the site is throttling us
         apply_btn.click()
-        time.sleep(2)
         
         # Handle confirmation dialog - checkbox and Submit button
         try:
             # Wait for the checkbox to appear
-            self.page.wait_for_selector('.mat-checkbox-inner-container', timeout=5000)
-            
             # Click specifically on the checkbox frame/box, NOT the label text (which has a link)
             # The .mat-checkbox-inner-container contains the actual clickable box
-            checkbox_box = self.page.query_selector('.mat-checkbox-inner-container')
+            checkbox_box = self.page.wait_for_selector('.mat-checkbox-inner-container', timeout=5000)
             if checkbox_box:
-                print(f"  Clicking agreement checkbox...")
+                logger.info(f"  Clicking agreement checkbox...")
                 checkbox_box.click()
-                time.sleep(0.5)
             
-            # Click Submit button
-            submit_btn = self.page.query_selector('button:has-text("Submit"), span:has-text("Submit")')
+            # Click Submit button (has-text also matches a button wrapping <span>Submit</span>)
+            submit_btn = self.page.query_selector('button:has-text("Submit"), button:has(span:has-text("Submit"))')
             if submit_btn:
-                # If it's a span, get the parent button
-                tag_name = submit_btn.evaluate('el => el.tagName')
-                if tag_name == 'SPAN':
-                    submit_btn = self.page.query_selector('button:has(span:has-text("Submit"))')
-                
-                if submit_btn:
-                    print(f"  Clicking Submit...")
-                    submit_btn.click()
-                    time.sleep(3)
+                logger.info(f"  Clicking Submit...")
+                _domain_limiter.pause()
+                submit_btn.click()
         except PlaywrightTimeout:
             # No confirmation dialog, continue
-            print(f"  No confirmation dialog found")
+            logger.info(f"  No confirmation dialog found")
         
         # Check for success (Applied button should now appear)
-        applied_check = self.page.query_selector('button.btn-grey-90:has-text("Applied")')
+        try:
+            applied_check = self.page.wait_for_selector('button.btn-grey-90:has-text("Applied")', timeout=10000)
+        except PlaywrightTimeout:
+            applied_check = None
         if applied_check:
             result['success'] = True
             result['message'] = "Successfully applied!"
-            print(f"  ✓ {result['message']}")
+            logger.info(f"  ✓ {result['message']}")
         else:
             # May have been redirected to login - check URL
             if 'login' in self.page.url.lower() or 'id4/account' in self.page.url.lower():
                 result['message'] = "Redirected to login - not logged in"
-                print(f"  ⚠ {result['message']}")
+                logger.info(f"  ⚠ {result['message']}")
             else:
                 result['success'] = True
                 result['message'] = "Application submitted (unverified)"
-                print(f"  ? {result['message']}")
-        
-        # Navigate back to lotteries list
-        print(f"  Navigating back to list...")
-        self.page.goto(self.LOTTERIES_URL)
-        time.sleep(random.uniform(3, 5))
+                logger.info(f"  ? {result['message']}")
         
-        try:
-            self.page.wait_for_selector('app-lottery-grid-card', timeout=45000)
-        except PlaywrightTimeout:
-            print(f"  Timeout on list, retrying...")
-            self.page.reload()
-            time.sleep(random.uniform(5, 8))
-            self.page.wait_for_selector('app-lottery-grid-card', timeout=60000)
-        
-        # Click the appropriate tab
-        if lottery_type == "sale":
-            tab = self.page.query_selector('span.font-lg:text-is("Sales")')
-        else:
-            tab = self.page.query_selector('span.font-lg:text-is("Rentals")')
-        if tab:
-            tab.click()
-            time.sleep(random.uniform(2, 3))
-        
-        return result
+        return True
     
     def apply_to_all_lotteries(self, lottery_type: str = "rental") -> list[dict]:
         """
-        Apply to all eligible lotteries by clicking through each one
+        Apply to all eligible lotteries, opening each detail page by ID
         
         MUST BE LOGGED IN FIRST
         """
-        print(f"\n{'='*60}")
-        print(f"APPLYING TO ALL {lottery_type.upper()} LOTTERIES")
-        print(f"{'='*60}\n")
-        
-        self.navigate_to_lotteries(lottery_type)
+        logger.info(f"\n{'='*60}")
+        logger.info(f"APPLYING TO ALL {lottery_type.upper()} LOTTERIES")
+        logger.info(f"{'='*60}\n")
         
         all_results = []
-        total_pages = self._get_total_pages()
         
-        for page_num in range(1, total_pages + 1):
-            print(f"\n--- Page {page_num} of {total_pages} ---")
-            
-            if page_num > 1:
-                self._go_to_page(page_num)
-            
-            # Get number of cards on this page
-            cards = self.page.query_selector_all('app-lottery-grid-card')
-            num_cards = len(cards)
-            print(f"Found {num_cards} lotteries on this page")
+        # Scrape the grid once; after that every lottery is reached by its detail URL,
+        # so there's no returning to the list, re-clicking the tab or re-paginating
+        for info in self.get_lottery_ids(lottery_type):
+            if info.is_applied:
+                logger.info(f"\nProcessing: {info.title}")
+                logger.info(f"  ⚠ Already applied (skipping)")
+                all_results.append({
+                    'success': False,
+                    'message': "Already applied",
+                    'already_applied': True,
+                    'eligible': True,
+                    'title': info.title,
+                    'lottery_id': info.id
+                })
+                continue
             
-            for i in range(num_cards):
-                # Navigate back to list page before each card
-                if 'search-lotteries' not in self.page.url:
-                    self.page.goto(self.LOTTERIES_URL)
-                    time.sleep(2)
-                    self.page.wait_for_selector('app-lottery-grid-card', timeout=15000)
-                    
-                    # Click correct tab
-                    tab_text = "Rentals" if lottery_type == "rental" else "Sales"
-                    tab = self.page.query_selector(f'span.font-lg:text-is("{tab_text}")')
-                    if tab:
-                        tab.click()
-                        time.sleep(1)
-                    
-                    # Go to correct page
-                    if page_num > 1:
-                        self._go_to_page(page_num)
-                
-                result = self.apply_to_lottery_by_click(i, lottery_type)
-                all_results.append(result)
-                
-                # Small delay between applications
-                time.sleep(1)
+            # Applications are spaced out by the DomainLimiter in _goto
+            result = self.apply_to_lottery_by_id(info.id, info.title)
+            all_results.append(result)
         
         # Summary
-        print(f"\n{'='*60}")
-        print("SUMMARY")
-        print(f"{'='*60}")
+        logger.info(f"\n{'='*60}")
+        logger.info("SUMMARY")
+        logger.info(f"{'='*60}")
         
-        applied = sum(1 for r in all_results if r['success'])
-        already = sum(1 for r in all_results if r['already_applied'])
-        not_eligible = sum(1 for r in all_results if not r['eligible'])
-        failed = sum(1 for r in all_results if not r['success'] and not r['already_applied'] and r['eligible'])
+        buckets = partition_results(all_results)
         
-        print(f"\n  ✓ Newly applied: {applied}")
-        print(f"  ⚠ Already applied: {already}")
-        print(f"  ✗ Not eligible: {not_eligible}")
-        print(f"  ? Failed: {failed}")
-        print(f"\n  Total processed: {len(all_results)}")
+        logger.info(f"\n  ✓ Newly applied: {len(buckets['applied'])}")
+        logger.info(f"  ⚠ Already applied: {len(buckets['already_applied'])}")
+        logger.info(f"  ✗ Not eligible: {len(buckets['not_eligible'])}")
+        logger.info(f"  🔒 Locked: {len(buckets['locked'])}")
+        logger.info(f"  ? Failed: {len(buckets['failed'])}")
+        logger.info(f"\n  Total processed: {len(all_results)}")
         
         return all_results
 
 
+@contextmanager
+def housing_bot(headless: bool = False) -> Iterator[HousingConnectBot]:
+    """
+    Yield this thread's shared HousingConnectBot, starting it on first use
+    
+    Helpers called inside one another (or inside a caller's own
+    `with housing_bot():`) reuse one context and its login instead of each
+    opening a bot. Reference-counted: the context closes when the outermost
+    user exits. headless only applies when the bot is first started.
+    """
+    bot = getattr(_thread_state, "bot", None)
+    if bot is None:
+        bot = HousingConnectBot(headless=headless)
+        bot.start()
+        _thread_state.bot = bot
+        _thread_state.bot_refs = 0
+    _thread_state.bot_refs += 1
+    try:
+        yield bot
+    finally:
+        _thread_state.bot_refs -= 1
+        if _thread_state.bot_refs == 0:
+            _thread_state.bot = None
+            bot.close()
+
+
+def result_status(result: dict) -> str:
+    """Classify an apply result as 'applied', 'already_applied', 'not_eligible', 'locked' or 'failed'"""
+    if result.get('success'):
+        return "applied"
+    if result.get('locked'):
+        return "locked"
+    if result.get('already_applied'):
+        return "already_applied"
+    if not result.get('eligible', True):
+        return "not_eligible"
+    return "failed"
+
+
+def partition_results(results: list[dict]) -> dict[str, list[dict]]:
+    """Group apply results by result_status in a single pass"""
+    buckets = {"applied": [], "already_applied": [], "not_eligible": [], "locked": [], "failed": []}
+    for result in results:
+        buckets[result_status(result)].append(result)
+    return buckets
+
+
+def load_applied_cache(path: str = APPLIED_CACHE_FILE, max_age_days: Optional[float] = None) -> dict:
+    """
+    Load per-lottery apply outcomes from previous runs
+    Returns dict of lottery id -> {'id': ..., 'title': ..., 'status': ..., 'timestamp': ...}
+    Entries older than max_age_days are dropped
+    """
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    
+    cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    return {
+        key: entry for key, entry in entries.items()
+        if cutoff is None or entry.get('timestamp', 0) >= cutoff
+    }
+
+
+def is_final_outcome(entry: dict, annual_income: int) -> bool:
+    """True if a cached outcome still holds, so the lottery can be skipped this run"""
+    if entry['status'] not in FINAL_STATUSES:
+        return False
+    # Eligibility depends on income, so it only holds for the income it was judged against
+    return entry['status'] != "not_eligible" or entry.get('annual_income') == annual_income
+
+
+def record_applied_result(cache: dict, lottery_id: str, title: str, result: dict,
+                          annual_income: Optional[int] = None, path: str = APPLIED_CACHE_FILE):
+    """
+    Record an apply outcome and write the cache through to disk atomically
+    annual_income is stored so a not_eligible outcome can be re-checked after SALARY changes.
+    'locked' outcomes aren't recorded: nothing is known yet, and the lock expires on its own
+    """
+    if result_status(result) == "locked":
+        return
+    cache[lottery_id] = {'id': lottery_id, 'title': title, 'status': result_status(result),
+                         'annual_income': annual_income, 'timestamp': time.time()}
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def prefetch_lottery_pages(lottery_type: str, headless: bool = False, storage_state: Optional[dict] = None,
+                           skip_applied: bool = False) -> Iterator[tuple[int, int, list[LotteryInfo]]]:
+    """
+    Yield the same (page_num, total_pages, lotteries) as iter_lottery_pages, but
+    scraped one page ahead by a background thread
+    
+    Browsers are per thread, so the producer launches a second Chromium process
+    (a second window when headless=False).
+    
+    Lets the caller's bot spend its time on detail pages while the next grid
+    page loads. Pass the caller's storage_state so the grid shows "Applied" badges.
+    """
+    pages = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            with HousingConnectBot(headless=headless, storage_state=storage_state, block_stylesheets=True) as bot:
+                for item in bot.iter_lottery_pages(lottery_type, skip_applied=skip_applied):
+                    if not put(item):
+                        return
+        except Exception as e:
+            put(e)
+        finally:
+            put(None)
+            shutdown_browser()
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while (item := pages.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def _scrape_lottery_ids(lottery_type: str, headless: bool) -> list[LotteryInfo]:
+    """Scrape one lottery type with its own bot (Playwright sync objects are thread-bound)"""
+    try:
+        with HousingConnectBot(headless=headless, block_stylesheets=True) as bot:
+            return bot.get_lottery_ids(lottery_type)
+    finally:
+        # The worker thread is about to finish, so its browser can't be reused
+        shutdown_browser()
+
+
 def get_all_lottery_ids(headless: bool = False) -> tuple[list[LotteryInfo], list[LotteryInfo]]:
-    """Get all lottery info (NO LOGIN REQUIRED)"""
-    with HousingConnectBot(headless=headless) as bot:
-        rental_lotteries = bot.get_lottery_ids("rental")
-        sale_lotteries = bot.get_lottery_ids("sale")
-        return rental_lotteries, sale_lotteries
+    """
+    Get all lottery info (NO LOGIN REQUIRED)
+    
+    Rentals and sales are independent public scrapes, so sales run in a worker
+    thread (with its own browser) while rentals use this thread's shared browser.
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        sale_future = pool.submit(_scrape_lottery_ids, "sale", headless)
+        with housing_bot(headless) as bot:
+            rental_lotteries = bot.get_lottery_ids("rental")
+        return rental_lotteries, sale_future.result()
 
 
 def check_and_apply(lottery_id: str, headless: bool = False) -> dict:
     """Login and apply to a lottery"""
-    with HousingConnectBot(headless=headless) as bot:
-        if not bot.login():
+    with housing_bot(headless) as bot:
+        if not bot.session_verified and not bot.login():
             return {'success': False, 'message': 'Login failed', 'lottery_id': lottery_id}
-        return bot.apply_to_lottery(lottery_id)
+        return bot.apply_to_lottery_by_id(lottery_id)
 
 
 if __name__ == "__main__":
@@ -681,16 +1313,13 @@ if __name__ == "__main__":
     
     rental_lotteries, sale_lotteries = get_all_lottery_ids(headless=False)
     
-    rental_ids = [l.id for l in rental_lotteries]
-    sale_ids = [l.id for l in sale_lotteries]
-    
-    print(f"\nRental IDs: {rental_ids}")
-    print(f"Sale IDs: {sale_ids}")
+    print(f"\nRental IDs: {len(rental_lotteries)}")
+    print(f"Sale IDs: {len(sale_lotteries)}")
     
     with open("rental_ids.txt", "w") as f:
-        f.write("\n".join(rental_ids))
+        f.writelines(f"{l.id}\n" for l in rental_lotteries)
     
     with open("sale_ids.txt", "w") as f:
-        f.write("\n".join(sale_ids))
+        f.writelines(f"{l.id}\n" for l in sale_lotteries)
     
     print("\nSaved to rental_ids.txt and sale_ids.txt")